@@ -1,4 +1,4 @@
-import sys, time, math, warnings, collections
+import sys, time, math, warnings, threading, collections
 import matplotlib
 matplotlib.use('TkAgg') #use tkinter early to fix window issues
 import matplotlib.pyplot as plt
@@ -6,6 +6,10 @@ import numpy as np
 import serial, serial.tools.list_ports
 from matplotlib.collections import LineCollection #efficient line manipulation 
 from matplotlib.widgets import Button, Slider     # <-- UI controls (button + sliders)
+try:
+    from numba import njit   # optional: JIT-compiles the fade kernel when installed
+except ImportError:
+    njit = None
 
 #Serial port selection
 COMMON_VID_PID = {(0x2341,0x0043),(0x2341,0x0001),(0x2341,0x0243), #compare ports found with common vendor and product ids
@@ -67,7 +71,9 @@ ax.tick_params(axis='both', colors='w')
 ax.grid(True, which='major', color='#75d950', linestyle='-', alpha=0.5)
 
 # Sweep line (live)
-sweep_line_plot, = ax.plot([], color='#79f07b', linewidth=3.0, alpha=0.85) #current sweep line
+sweep_line_plot, = ax.plot([], color='#79f07b', linewidth=3.0, alpha=0.85, animated=True) #current sweep line
+_sweep_x = np.zeros(2, dtype=np.float32)              # both ends at the sweep angle, updated in place
+_sweep_y = np.array([0.0, 100.0], dtype=np.float32)
 
 #Full-length fading trails
 # Each "hit" is a segment from r=0 to r=distance at a fixed theta.
@@ -76,13 +82,50 @@ HALF_LIFE = 1               # seconds; exponential fade 50%/half-life
 ALPHA_MIN = 0.03            # below this alpha, drop the segment
 MAX_HITS = 4000             # cap to keep memory bounded
 HIT_RGB = (0.49, 1.00, 0.49)   # green-ish echo lines (alpha varies)
-
-# store (theta_rad, distance_cm, t_created, seq)
-hits = collections.deque(maxlen=MAX_HITS) #store hits fast
+AGE_CUTOFF = min(TRAIL_MAX_SECONDS, -HALF_LIFE * math.log(ALPHA_MIN))  # age where alpha drops below ALPHA_MIN (~3.5 s)
+
+# store hits as parallel arrays (theta_rad, distance_cm, t_created, seq), oldest first.
+# Live hits occupy [hit_tail:hit_head]; t_created only grows, so expired hits are
+# dropped by bumping hit_tail, and the live range is moved back to 0 when head hits the end.
+hit_th = np.empty(MAX_HITS, dtype=np.float32)
+hit_r = np.empty(MAX_HITS, dtype=np.float32)
+hit_t0 = np.empty(MAX_HITS, dtype=np.float64)
+hit_seq = np.empty(MAX_HITS, dtype=np.int64)
+hit_tail = 0   # oldest hit that may still be visible
+hit_head = 0   # next slot to write
 _hit_seq = 0  # monotonically increasing sequence number for spacing labels
 
+def _compact_hits(n):
+    # make room for n more hits: move the live range back to index 0 (dropping the oldest hits if needed)
+    global hit_tail, hit_head
+    hit_tail = max(hit_tail, hit_head - (MAX_HITS - n))
+    m = hit_head - hit_tail
+    for a in (hit_th, hit_r, hit_t0, hit_seq):
+        a[:m] = a[hit_tail:hit_head]
+    hit_tail, hit_head = 0, m
+
+def add_hits(th, r, t0):
+    # append a batch of hits at head in one slice assignment; t0 is the batch timestamp
+    global hit_head, _hit_seq
+    th, r = th[-MAX_HITS:], r[-MAX_HITS:]
+    n = len(th)
+    if hit_head + n > MAX_HITS:
+        _compact_hits(n)
+    end = hit_head + n
+    hit_th[hit_head:end] = th
+    hit_r[hit_head:end] = r
+    hit_t0[hit_head:end] = t0
+    hit_seq[hit_head:end] = np.arange(_hit_seq + 1, _hit_seq + n + 1)
+    _hit_seq += n
+    hit_head = end
+
+def _expire_hits(now):
+    # bump tail past hits too old to be visible (binary search, t0 is sorted)
+    global hit_tail
+    hit_tail += int(np.searchsorted(hit_t0[hit_tail:hit_head], now - AGE_CUTOFF))
+
 # Use a LineCollection so we can redraw many segments efficiently
-trail = LineCollection([], linewidths=2.2, antialiased=True)
+trail = LineCollection([], linewidths=2.2, antialiased=True, animated=True)  # blitted, see below
 trail.set_transform(ax.transData)  # polar data coords
 ax.add_collection(trail)
 
@@ -93,7 +136,7 @@ plt.pause(0.05)
 # keep your comments; new ones below explain the UI widgets only.
 # Button to toggle showing text at the end of the line (distance)
 ui_ax_toggle = fig.add_axes([0.80, 0.83, 0.17, 0.07])  # x, y, w, h
-btn_toggle = Button(ui_ax_toggle, 'Toggle Length Text')
+btn_toggle = Button(ui_ax_toggle, 'Toggle Length Text', useblit=False)  # full redraw on hover recaptures the blit background
 
 # Slider for text size
 ui_ax_font = fig.add_axes([0.80, 0.72, 0.17, 0.03])
@@ -115,18 +158,25 @@ show_labels = False
 label_fontsize = int(sld_font.val)
 label_every = int(sld_spacing.val)
 
-# For managing label artists (Text instances)
+# For managing label artists (Text instances): a pool reused every frame,
+# only the first _labels_shown are visible
 _label_artists = []
+_labels_shown = 0
+_DIST_STR = [f"{i} cm" for i in range(101)]   # label text per whole cm (hits are 0..100 cm)
+
+def _label_text(k):
+    # k-th pooled text artist, created hidden on first use
+    while len(_label_artists) <= k:
+        _label_artists.append(ax.text(0.0, 0.0, "", ha='left', va='center',
+                                      transform=ax.transData, visible=False, animated=True))
+    return _label_artists[k]
 
 def _clear_labels():
-    # remove existing text artists from the axes
-    global _label_artists
-    for t in _label_artists:
-        try:
-            t.remove()
-        except Exception:
-            pass
-    _label_artists = []
+    # hide the pooled text artists that are currently shown
+    global _labels_shown
+    for t in _label_artists[:_labels_shown]:
+        t.set_visible(False)
+    _labels_shown = 0
 
 def _on_toggle(event):
     # flip the visibility flag and clear any existing labels when hiding
@@ -150,15 +200,16 @@ sld_font.on_changed(_on_font_change)
 sld_spacing.on_changed(_on_spacing_change)
 
 #Non-blocking serial line parser
-buf = ""
-def parse(s: str):
+RAD_LUT = np.radians(np.arange(181, dtype=np.float32))  # angles are whole degrees 0..180
+def parse(s: bytes):
+    # works on raw bytes: int()/float() accept them, so lines are never decoded
     s = s.strip()
-    if not s or ',' not in s: return None
-    a_str, d_str = s.split(',', 1)
+    if not s or b',' not in s: return None
+    a_str, d_str = s.split(b',', 1)
     try: ang = int(float(a_str))
     except ValueError: return None
     if not (0 <= ang <= 180): return None
-    if d_str.upper() == "NA":
+    if d_str.upper() == b"NA":
         return ang, np.nan
     try:
         dist = float(d_str)
@@ -168,98 +219,205 @@ def parse(s: str):
         dist = np.nan
     return ang, dist
 
-#Helper to rebuild segments with fading
-def rebuild_trails(now):
-    segs = []
-    cols = []
+_no_ang = np.empty(0, dtype=np.intp)
+_no_dist = np.empty(0, dtype=np.float32)
+
+def parse_batch(lines):
+    # parse a drain's lines into (angles, distances) arrays, distance NaN where there was
+    # no valid echo. Line by line: the sketch sends ~8 lines/s, so drains are about one
+    # line, and parse is faster than np.loadtxt there and keeps its exact rules
+    parsed = [p for p in map(parse, lines) if p]
+    if not parsed:
+        return _no_ang, _no_dist
+    ang, dist = zip(*parsed)
+    return np.array(ang, dtype=np.intp), np.array(dist, dtype=np.float32)
+
+#Fade kernel: fills preallocated segment/color buffers in one pass, returns the alive count
+# float64 on purpose: set_segments wraps each (2,2) row as a Path without converting it
+_seg_buf = np.empty((MAX_HITS, 2, 2))           # (theta, r) start/end of each radial line
+_seg_buf[:, 0, 1] = 0.0                         # every line starts at r=0
+_col_buf = np.empty((MAX_HITS, 4))              # rgba per line; only alpha changes per frame
+_col_buf[:, :3] = HIT_RGB
+_no_col = np.array([(*HIT_RGB, 0.0)])           # single transparent color for an empty trail
+_idx_buf = np.empty(MAX_HITS, dtype=np.int64)   # offset of each alive hit from hit_tail
+
+def _build_segments(theta, dist, t0, now, hl, age_max, out_segs, out_cols, out_idx):
+    # numpy fallback (no numba): same result as the loop below
+    age = now - t0
+    idx = np.flatnonzero(age <= age_max)   # age cutoff instead of an alpha threshold
+    k = len(idx)
+    out_segs[:k, 0, 0] = out_segs[:k, 1, 0] = theta[idx]   # full radial line
+    out_segs[:k, 1, 1] = dist[idx]
     # Exponential fade feels smoother than linear
-    for th, r, t0, _seq in list(hits):
-        age = now - t0
-        if age > TRAIL_MAX_SECONDS:
-            continue
-        # alpha = 0.5 ** (age / HALF_LIFE)  # exponential
-        alpha = math.exp(-age / HALF_LIFE)
-        if alpha < ALPHA_MIN:
-            continue
-        segs.append([(th, 0.0), (th, r)])       # full radial line
-        cols.append((*HIT_RGB, alpha))
-    trail.set_segments(segs)
-    if cols:
-        trail.set_colors(cols)
+    # alpha = 0.5 ** (age / HALF_LIFE)  # exponential
+    out_cols[:k, 3] = np.exp(-age[idx] / hl)
+    out_idx[:k] = idx
+    return k
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _build_segments(theta, dist, t0, now, hl, age_max, out_segs, out_cols, out_idx):
+        k = 0
+        for i in range(t0.shape[0]):
+            age = now - t0[i]
+            if age > age_max:
+                continue
+            alpha = math.exp(-age / hl)
+            out_segs[k, 0, 0] = theta[i]
+            out_segs[k, 1, 0] = theta[i]
+            out_segs[k, 1, 1] = dist[i]
+            out_cols[k, 3] = alpha
+            out_idx[k] = i
+            k += 1
+        return k
+
+#Fade pass shared by trails and labels: one exp() per hit per frame
+def _compute_alive(now):
+    # returns (idx, theta, dist, seq, alpha) for the hits still visible, oldest first;
+    # theta/dist/alpha are views into the kernel buffers
+    _expire_hits(now)
+    k = _build_segments(hit_th[hit_tail:hit_head], hit_r[hit_tail:hit_head], hit_t0[hit_tail:hit_head],
+                        now, HALF_LIFE, AGE_CUTOFF, _seg_buf, _col_buf, _idx_buf)
+    idx = hit_tail + _idx_buf[:k]
+    return idx, _seg_buf[:k, 1, 0], _seg_buf[:k, 1, 1], hit_seq[idx], _col_buf[:k, 3]
+
+#Helper to rebuild segments with fading
+def rebuild_trails(alive):
+    # segments/colors for the alive hits are already in the kernel buffers
+    k = len(alive[0])
+    trail.set_segments(_seg_buf[:k])
+    if k:
+        trail.set_colors(_col_buf[:k])
     else:
-        trail.set_colors([(*HIT_RGB, 0.0)])
+        trail.set_colors(_no_col)
 
-def rebuild_labels(now):
+def rebuild_labels(alive):
     # draw text at the end of selected trails (every Nth), with fading alpha matching the line
-    _clear_labels()
+    global _labels_shown
     if not show_labels:
-        return
+        return   # _on_toggle already hid them
+    _idx, ths, rs, seqs, alphas = alive
+    # spacing: only label every Nth reading by sequence number
+    pick = (seqs % label_every) == 0
     # Iterate newest-to-oldest so the freshest labels appear on top
-    for th, r, t0, seq in reversed(hits):
-        age = now - t0
-        if age > TRAIL_MAX_SECONDS:
-            continue
-        alpha = math.exp(-age / HALF_LIFE)
-        if alpha < ALPHA_MIN:
-            continue
-        # spacing: only label every Nth reading by sequence number
-        if (seq % label_every) != 0:
-            continue
-        # Create text at the line end
-        txt = f"{r:.0f} cm"
-        t = ax.text(th, r, txt,
-                    fontsize=label_fontsize,
-                    color=(HIT_RGB[0], HIT_RGB[1], HIT_RGB[2], alpha),
-                    ha='left', va='center', transform=ax.transData)
-        _label_artists.append(t)
-
-print("Reading from serial... (close the Arduino Serial Monitor)")
-
-#Main loop
-last_gui = time.perf_counter()
-while True:
-    # Read all available bytes without blocking
+    k = 0
+    for th, r, alpha in zip(ths[pick][::-1], rs[pick][::-1], alphas[pick][::-1]):
+        # Move a pooled text to the line end
+        t = _label_text(k)
+        t.set_position((th, r))
+        t.set_text(_DIST_STR[int(round(r))])   # round half to even, like f"{r:.0f}"
+        t.set_color((HIT_RGB[0], HIT_RGB[1], HIT_RGB[2], alpha))
+        t.set_fontsize(label_fontsize)
+        t.set_visible(True)
+        k += 1
+    # hide pooled labels left over from the previous frame
+    for t in _label_artists[k:_labels_shown]:
+        t.set_visible(False)
+    _labels_shown = k
+
+#Blitting: trail, labels and sweep are animated artists drawn over a cached background
+# (polar grid, ticks, widgets) instead of redrawing the whole figure every frame.
+# The whole figure is restored/blitted, not just ax.bbox: labels near the rim overhang the axes.
+_bg = None
+
+def _draw_animated():
+    ax.draw_artist(trail)
+    for t in _label_artists[:_labels_shown]:
+        ax.draw_artist(t)
+    ax.draw_artist(sweep_line_plot)
+
+def _on_draw(event):
+    # a full draw happened (startup, resize, widget change): recapture the background.
+    # Resizes are covered here too: the canvas redraws at the new size and fires this event
+    global _bg
+    _bg = fig.canvas.copy_from_bbox(fig.bbox)
+    _draw_animated()
+
+fig.canvas.mpl_connect('draw_event', _on_draw)
+fig.canvas.draw()
+
+#Serial reader thread: keeps the port drained even while the GUI is busy drawing
+inbox = collections.deque(maxlen=MAX_HITS)   # (angles_rad, distances, t_ingest) batches, thread-safe
+reader_error = None   # exception that stopped the reader, re-raised by the main loop
+
+def _reader():
     """
-    Reads whatever bytes are available right now; never waits.
-
-    Splits on newlines safely (keeps partial tail in buf).
+    Reads whatever bytes are available; sleeps 1 ms when there are none.
 
-    For each complete reading:
+    Splits on newlines safely (keeps partial tail in buf, as bytes).
 
-    converts angle -> radians,
+    Parses all complete readings in one batch:
 
-    moves the sweep line to that angle immediately,
+    converts angles -> radians,
 
-    if distance is valid, records a hit with a timestamp (for fading).
+    queues them with the time they were read (for fading).
     """
-    n = ser.in_waiting
-    if n:
-        chunk = ser.read(n).decode("utf-8", errors="replace")
-        buf += chunk
-        if '\n' in buf:
-            lines = buf.splitlines(keepends=False)
-            if not buf.endswith('\n'):
-                buf = lines[-1]; lines = lines[:-1]
-            else:
-                buf = ""
-            for line in lines:
-                parsed = parse(line)
-                if not parsed:
-                    continue
-                ang, dist = parsed
-                rad = math.radians(ang)
-                # Move live sweep
-                sweep_line_plot.set_data([rad, rad], [0.0, 100.0])
-                # Add a full-length trail segment if distance is valid
-                if not np.isnan(dist):
-                    _hit_seq += 1
-                    hits.append((rad, float(dist), time.perf_counter(), _hit_seq))
-
-    # Refresh GUI ~100 fps max
-    now = time.perf_counter()
-    if now - last_gui >= 0.01:
-        rebuild_trails(now)
-        rebuild_labels(now)          # <-- update labels after rebuilding trails
-        fig.canvas.draw_idle()
-        plt.pause(0.001) #give tk some time to execute gui
-        last_gui = now
+    buf = bytearray()   # raw bytes received but not yet split into lines
+    while True:
+        n = ser.in_waiting
+        if not n:
+            time.sleep(0.001)
+            continue
+        buf.extend(ser.read(n))
+        end = buf.rfind(b'\n')
+        if end < 0:
+            continue
+        t = time.perf_counter()   # one timestamp for every reading in this drain
+        lines = buf[:end].split(b'\n')
+        del buf[:end + 1]   # keep only the partial tail, in place
+        ang, dist = parse_batch(lines)
+        if len(ang):
+            inbox.append((RAD_LUT[ang], dist, t))
+
+def _run_reader():
+    # keep a failure (e.g. SerialException when the board is unplugged) for the main loop,
+    # so the program stops instead of showing a frozen radar
+    global reader_error
+    try:
+        _reader()
+    except Exception as e:
+        reader_error = e
+
+print("Reading from serial... (close the Arduino Serial Monitor)")
+threading.Thread(target=_run_reader, daemon=True).start()
+
+#Main loop: sweep ~100 fps max, trails/labels ~25 fps (fading that slow looks the same)
+dirty = False        # something moved since the last blit
+trail_stale = False  # hits arrived since the last trail rebuild
+trail_alive = False  # the last trail rebuild still had fading hits
+last_trail = 0.0
+while True:
+    if reader_error is not None:
+        raise reader_error
+    # Take every batch the reader queued since the last tick
+    sweep = None
+    while inbox:
+        rad, dist, t = inbox.popleft()
+        # Add full-length trail segments where the distance is valid
+        ok = ~np.isnan(dist)
+        add_hits(rad[ok], dist[ok], t)
+        sweep = rad[-1]
+        trail_stale = True
+    if sweep is not None:
+        # Move live sweep to the latest angle
+        _sweep_x[:] = sweep
+        sweep_line_plot.set_data(_sweep_x, _sweep_y)
+        dirty = True
+
+    now = time.perf_counter()   # one clock read per tick, after the drain: no hit is newer than now
+    if (trail_stale or trail_alive) and now - last_trail >= 0.04:
+        alive = _compute_alive(now)
+        rebuild_trails(alive)
+        rebuild_labels(alive)        # <-- update labels after rebuilding trails
+        trail_alive = len(alive[0]) > 0
+        trail_stale = False
+        last_trail = now
+        dirty = True
+    # skip the redraw while nothing moves or fades
+    if dirty:
+        dirty = False
+        fig.canvas.restore_region(_bg)
+        _draw_animated()
+        fig.canvas.blit(fig.bbox)
+    fig.canvas.flush_events() #give tk some time to execute gui
+    time.sleep(max(0.0, 0.01 - (time.perf_counter() - now)))